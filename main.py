@@ -19,13 +19,14 @@ parser.add_argument('--dataset', default=None)
 parser.add_argument('--nosave', default=False, action='store_true')
 parser.add_argument('--alpha', default=0.05, type=float)
 
-args = parser.parse_args()
+if __name__ == '__main__':
+    args = parser.parse_args()
 
-# run experiments on datasets
-if args.run_experiments:
-    datasets = [utils.get_dataset(args.dataset)] if args.dataset is not None else config.datasets
-    experiment(datasets, args.log, args.cpu, args.nosave)
+    # run experiments on datasets
+    if args.run_experiments:
+        datasets = [utils.get_dataset(args.dataset)] if args.dataset is not None else config.datasets
+        experiment(datasets, args.log, args.cpu, args.nosave)
 
-# run analysis on results
-if args.run_analysis:
-    populate([args.alpha])  
\ No newline at end of file
+    # run analysis on results
+    if args.run_analysis:
+        populate([args.alpha], n_jobs=args.cpu)  
\ No newline at end of file
@@ -6,10 +6,12 @@ import utils
 from scipy.stats import ttest_rel
 import config
 import os
-from matplotlib import pyplot as plt
 from statsmodels.stats.multitest import multipletests, fdrcorrection_twostage
 import json
 import sys
+from functools import lru_cache
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 """Compare class"""
 class Compare(object):
@@ -25,6 +27,11 @@ class Compare(object):
         self.compare_metric = compare_metric
         self.compare_method = compare_method
 
+        # index result by error type once, each comparison only scans its own subset
+        self.result_by_error = defaultdict(dict)
+        for k, v in result.items():
+            self.result_by_error[k[2]][k] = v
+
         self.four_metrics = {}
         self.compare_result = {}
         for error_type in config.error_types:
@@ -44,8 +51,8 @@ class Compare(object):
             file_types (list): names of two types of train or test files
         """
         four_metrics = {}
-        for (dataset, split_seed, error, train_file, model), value in self.result.items():
-            if error == error_type and train_file in file_types:
+        for (dataset, split_seed, error, train_file, model), value in self.result_by_error[error_type].items():
+            if train_file in file_types:
                 for test_file in file_types:
                     metric_name = self.compare_metric(dataset, error_type, test_file)
                     metric = value[metric_name]
@@ -77,10 +84,13 @@ class Compare(object):
         comparison = {}
         datasets = list(set(four_metrics.index.get_level_values(0)))
         models = list(set(four_metrics.columns.get_level_values(0)))
+        error_scenarios = config.scenarios[error_type]
         for dataset in datasets:
+            # resolve the dataset rows once and select models from that slice
+            dataset_metrics = four_metrics.loc[dataset]
             for model in models:
-                m = four_metrics.loc[dataset, model]
-                for s in config.scenarios[error_type]:
+                m = dataset_metrics[model]
+                for s in error_scenarios:
                     comparison[(dataset, model, s)] = scenarios[s](m)
         # comparison = utils.dict_to_df(comparison, [0, 1], [2])
         return comparison
@@ -98,7 +108,7 @@ class Compare(object):
         ## each error has two types of files
         # file type 1
         file1 = "delete" if error_type == "missing_values" else "dirty"
-        file2 = list(set([k[3] for k in self.result.keys() if k[2] == error_type and k[3] != file1]))
+        file2 = list(set([k[3] for k in self.result_by_error[error_type].keys() if k[3] != file1]))
         comparisons = {}
         metrics = {}
 
@@ -114,7 +124,6 @@ class Compare(object):
         for error_type in config.error_types:
             save_path = os.path.join(save_dir, "{}_four_metrics.xlsx".format(error_type['name']))
             utils.dfs_to_xls(self.four_metrics[error_type['name']], save_path)
-        flat_metrics = utils.flatten_dict(self.four_metrics)
 
 """Comparing method"""
 def t_test(dirty, clean):
@@ -127,8 +136,7 @@ def t_test(dirty, clean):
             t, p = 0, 1
         return {"t-stats":t, "p-value":p}
 
-    def one_tailed_t_test(dirty, clean, direction):
-        two_tail = two_tailed_t_test(dirty, clean)
+    def one_tailed_t_test(two_tail, direction):
         t, p_two = two_tail['t-stats'], two_tail['p-value']
         if direction == 'positive':
             if t > 0 :
@@ -142,10 +150,15 @@ def t_test(dirty, clean):
                 p = 1 - p_two * 0.5
         return {"t-stats":t, "p-value":p}
      
+    # convert to arrays once so truncation takes views instead of copies
+    dirty = np.asarray(dirty)
+    clean = np.asarray(clean)
+
+    # one-tailed tests are derived from the same two-tailed result
     result = {}
     result['two_tail'] = two_tailed_t_test(dirty, clean)
-    result['one_tail_pos'] = one_tailed_t_test(dirty, clean, 'positive')
-    result['one_tail_neg'] = one_tailed_t_test(dirty, clean, 'negative')
+    result['one_tail_pos'] = one_tailed_t_test(result['two_tail'], 'positive')
+    result['one_tail_neg'] = one_tailed_t_test(result['two_tail'], 'negative')
     return result
 
 def mean_f1(dirty, clean):
@@ -177,6 +190,7 @@ def test_acc(dataset_name, error_type, test_file):
     metric = test_file + "_test_acc"
     return metric
 
+@lru_cache(maxsize=None)
 def mixed_f1_acc(dataset_name, error_type, test_file):
     if error_type == 'mislabel':
         dataset_name = dataset_name.split('_')[0]
@@ -316,22 +330,32 @@ def populate_relation(result, name, alphas=[0.05], split_detect=True, multiple_t
         save_path = os.path.join(relation_pkl_dir, '{}_{}.pkl'.format(name, "{:.6f}".format(alpha).rstrip('0')))
         utils.df_to_pickle(relation_df, save_path)
 
-def populate(alphas, save_training=False):
-    """Populate R1, R2 and R3"""
+def populate(alphas, save_training=False, n_jobs=1):
+    """Populate R1, R2 and R3
+
+    Args:
+        alphas (list): significance levels for multiple hypothesis test
+        save_training (bool): whether to save training result tables
+        n_jobs (int): num of processes used to populate relations
+    """
     result = utils.load_result(parse_key=True)
 
     if save_training:
         save_dir = os.path.join(config.analysis_dir, "training_result")
         utils.result_to_table(result, save_dir)
 
-    # populate R1
+    # group results for R1, R2 and R3
     result_mean = group_by_mean(result)
-    populate_relation(result_mean, "R1", alphas=alphas)
-
-    # populate R2
     result_best_model = group_by_best_model(result)
-    populate_relation(result_best_model, "R2", alphas=alphas)
-
-    # # populate R3
     result_best_model_clean = group_by_best_model_clean(result_best_model)
-    populate_relation(result_best_model_clean, "R3", alphas=alphas)
\ No newline at end of file
+    relations = [(result_mean, "R1"), (result_best_model, "R2"), (result_best_model_clean, "R3")]
+
+    # populate relations, which are independent of each other
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(populate_relation, res, name, alphas=alphas) for res, name in relations]
+            for future in futures:
+                future.result()
+    else:
+        for res, name in relations:
+            populate_relation(res, name, alphas=alphas)
\ No newline at end of file
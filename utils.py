@@ -4,14 +4,15 @@ import config
 import sys
 import json
 import numpy as np
-from matplotlib import pyplot as plt
 import shutil
 from collections import defaultdict
+from functools import lru_cache
 
 # =============================================================================
 # Data related utils
 # =============================================================================
 
+@lru_cache(maxsize=None)
 def get_dataset(name):
     """Get dataset dict in config.py given name
 
@@ -62,8 +63,8 @@ def get_dir(dataset, folder=None, file=None, create_folder=False):
         return data_dir
 
     folder_dir = os.path.join(data_dir, folder)
-    if create_folder and not os.path.exists(folder_dir):
-        os.makedirs(folder_dir)
+    if create_folder:
+        os.makedirs(folder_dir, exist_ok=True)
 
     if file is None:
         return folder_dir
@@ -277,11 +278,7 @@ def load_result(dataset_name=None, parse_key=False):
             result.update(json.load(open(path, 'r')))
 
     if parse_key:
-        new_result = {}
-        for key, value in result.items():
-            new_key = tuple(key.split('/'))
-            new_result[new_key] = value
-        result = new_result
+        result = {tuple(key.split('/')): value for key, value in result.items()}
 
     return result
 
@@ -296,8 +293,7 @@ def save_result(dataset_name, key, res):
     result = load_result(dataset_name)
     result[key] = res
     result_path = os.path.join(config.result_dir, '{}_result.json'.format(dataset_name))
-    if not os.path.exists(config.result_dir):
-        os.makedirs(config.result_dir)
+    os.makedirs(config.result_dir, exist_ok=True)
     json.dump(result, open(result_path, 'w'))
 
 def dict_to_df(dic, row_keys_idx, col_keys_idx):
@@ -308,10 +304,17 @@ def dict_to_df(dic, row_keys_idx, col_keys_idx):
         row_keys_idx: index of keys for rows, ordered hierarchicallly
         col_keys_idx: index of keys for columns, ordered hierarchicallly
     """
-    col_keys = sorted(set([tuple([k[i] for i in col_keys_idx]) for k in dic.keys()]))[::-1]
-    row_keys = sorted(set([tuple([k[i] for i in row_keys_idx]) for k in dic.keys()]))[::-1]
-    sheet_idx = [i for i in np.arange(len(list(dic.keys())[0])) if i not in row_keys_idx and i not in col_keys_idx]
-    sheet_keys = sorted(set([tuple([k[i] for i in sheet_idx]) for k in dic.keys()]))
+    sheet_idx = [i for i in np.arange(len(next(iter(dic.keys())))) if i not in row_keys_idx and i not in col_keys_idx]
+
+    # collect column, row and sheet keys in a single pass over dict keys
+    col_keys, row_keys, sheet_keys = set(), set(), set()
+    for k in dic.keys():
+        col_keys.add(tuple([k[i] for i in col_keys_idx]))
+        row_keys.add(tuple([k[i] for i in row_keys_idx]))
+        sheet_keys.add(tuple([k[i] for i in sheet_idx]))
+    col_keys = sorted(col_keys)[::-1]
+    row_keys = sorted(row_keys)[::-1]
+    sheet_keys = sorted(sheet_keys)
 
     if len(sheet_keys) > 1:
         print(sheet_keys)
@@ -349,28 +352,29 @@ def dict_to_dfs(dic, row_keys_idx, col_keys_idx, df_idx):
         col_keys_idx (int): index of keys for columns, ordered hierarchicallly
         df_idx (int): index of keys for spliting dict to multiple dfs.
     """
+    # bucket dict by df key in one pass instead of filtering the whole dict per df
+    filtered_dics = defaultdict(dict)
+    for key, value in dic.items():
+        filtered_dics[key[df_idx]][key] = value
+
     dfs = {}
-    df_keys = sorted(set([k[df_idx] for k in dic.keys()]))
-    for k in df_keys:
-        filtered_dic = {key:value for key, value in dic.items() if key[df_idx] == k}           
-        df = dict_to_df(filtered_dic, row_keys_idx, col_keys_idx)
+    for k in sorted(filtered_dics.keys()):
+        df = dict_to_df(filtered_dics[k], row_keys_idx, col_keys_idx)
         dfs[k] = df
     return dfs
 
 def df_to_xls(df, save_path):
     """Save single pd.DataFrame to a excel file"""
     directory = os.path.dirname(save_path)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-    writer = pd.ExcelWriter(save_path)
+    os.makedirs(directory, exist_ok=True)
+    writer = pd.ExcelWriter(save_path, engine='xlsxwriter')
     df.to_excel(writer)
     writer.save()
 
 def df_to_pickle(df, save_path):
     """Save single pd.DataFrame to a pickle file"""
     directory = os.path.dirname(save_path)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
+    os.makedirs(directory, exist_ok=True)
     df.to_pickle(save_path)
 
 def dfs_to_xls(dfs, save_path):
@@ -380,9 +384,8 @@ def dfs_to_xls(dfs, save_path):
         dfs (dict): {sheet_name: pd.DataFrame}
     """
     directory = os.path.dirname(save_path)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-    writer = pd.ExcelWriter(save_path)
+    os.makedirs(directory, exist_ok=True)
+    writer = pd.ExcelWriter(save_path, engine='xlsxwriter')
     for k, df in dfs.items():
         df.to_excel(writer, '%s'%k)
     writer.save()
@@ -440,8 +443,7 @@ def rearrange_dict(dictionary, order):
 
 def makedirs(dir_list):
     save_dir = os.path.join(*dir_list)
-    if not os.path.exists(save_dir):
-        os.makedirs(save_dir)
+    os.makedirs(save_dir, exist_ok=True)
     return save_dir
 
 def result_to_table(result, save_dir, csv=True, xls=True):
@@ -468,7 +470,7 @@ def result_to_table(result, save_dir, csv=True, xls=True):
 
         for dataset in datasets:
             dataset_result = flatten_dict({k:v for k, v in result.items() if k[0] == dataset})
-            save_path = os.path.join(xls_dir, '{}_result.xls'.format(dataset))
+            save_path = os.path.join(xls_dir, '{}_result.xlsx'.format(dataset))
             dict_to_xls(dataset_result, [0, 1, 3, 4, 5], [6], save_path, sheet_idx=2)
             
 def group(result, idx, keepdim=False):
@@ -482,19 +484,18 @@ def group(result, idx, keepdim=False):
         keepdim (bool): keep or delete dimension by which the result is grouped 
     """
 
-    # get domain in given dimension (key component)
-    domain = list({k[idx] for k in result.keys()})
+    # bucket results by their value in given dimension (key component) in one pass
+    domain = defaultdict(list)
+    for old_key, v in result.items():
+        domain[old_key[idx]].append((old_key, v))
 
     # loop through each value in domain, append corresponding results into a list
     new_result = {}
-    for x in domain:
-        for old_key, v in result.items():
-
-            if x != old_key[idx]:
-                continue
+    for x, entries in domain.items():
+        for old_key, v in entries:
 
             # new key (eliminate the given dimension)
-            new_key = tuple([old_key[i] for i in range(len(old_key)) if i != idx])
+            new_key = old_key[:idx] + old_key[idx+1:]
 
             # new value 
             if new_key not in new_result.keys():
@@ -531,7 +532,8 @@ def reduce_by_mean(result):
     for k, v in result.items():
         new_value = {}
         for vk, vv in v.items():
-            new_value[vk] = np.mean(vv)
+            # lists are short (one entry per seed), plain sum avoids np.mean's array overhead
+            new_value[vk] = sum(vv) / len(vv)
         new_result[k] = new_value
     return new_result
 